@@ -1,80 +1,79 @@
+import io
 import re
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from functools import lru_cache
 import streamlit as st
-import tempfile
-import os
+
+# Precompiled patterns used by the extraction helpers
+_PHONE_RE = re.compile(r'(?:\+88)?(\d{11})')  # 11-digit number with optional +88 prefix
+# Number followed by "টাকা"/"Taka" anywhere in the text, otherwise the first number
+_AMOUNT_RE = re.compile(r'^(?:.*?(\d+)\s*(?:টাকা|Taka|taka)|\D*(\d+))', re.DOTALL)
+# A line break followed by one or more blank lines, for any line ending style;
+# \r(?!\n) keeps the engine from splitting a \r\n pair into two breaks
+_SPLIT_RE = re.compile(r'(?:\r\n|\r(?!\n)|\n)(?:[^\S\r\n]*(?:\r\n|\r(?!\n)|\n))+')
+_STARTS_WITH_NAME_RE = re.compile(r'^(?:নাম|name|nam|আপনার নাম|আমার নাম|md)', re.IGNORECASE)
+_NAME_PREFIX_RE = re.compile(r'^(?:আমার নাম|আপনার নাম|নাম,|নামঃ|নাম|name|nam)\s*[:：]?\s*', re.IGNORECASE)
+
+# Keyword patterns used to classify lines within a customer block
+_NAME_KW_RE = re.compile(r'নাম|name|nam')
+_ADDR_RE = re.compile(r'jela|Jela|জেলা|থানা|এলাকা|ঠিকানা|address|Address|ADDRESS|area')
+_ORDER_RE = re.compile(r'অর্ডার|অডার|order|Order')
+
+# Bengali to English digit translation table
+_BN_TRANS = str.maketrans('০১২৩৪৫৬৭৮৯', '0123456789')
+_BN_SCAN = re.compile(r'[০-৯]')
 
 def bengali_to_english_digits(text):
     """Convert Bengali digits to English digits"""
-    bengali_digits = '০১২৩৪৫৬৭৮৯'
-    english_digits = '0123456789'
-    translation_table = str.maketrans(bengali_digits, english_digits)
-    return text.translate(translation_table)
+    # Skip the copy made by translate() when there are no Bengali digits
+    return text.translate(_BN_TRANS) if _BN_SCAN.search(text) else text
 
+@lru_cache(maxsize=4096)
 def extract_phone_number(line):
     """Extract phone number from a line, handling both English and Bengali digits"""
     # First convert any Bengali digits to English
     english_line = bengali_to_english_digits(line)
 
     # Look for 11-digit phone numbers (with optional +88 prefix)
-    phone_patterns = [
-        r'(\d{11})',  # Standard 11-digit number
-        r'\+88(\d{11})',  # +88 prefix followed by 11 digits
-    ]
-
-    for pattern in phone_patterns:
-        match = re.search(pattern, english_line)
-        if match:
-            return match.group(1)
-
-    return None
+    match = _PHONE_RE.search(english_line)
+    return match.group(1) if match else None
 
+@lru_cache(maxsize=4096)
 def extract_amount(note_text):
     """Extract amount from note text using regex pattern matching"""
     # Convert Bengali digits to English for easier processing
     text = bengali_to_english_digits(note_text)
 
-    # Pattern to match amount (looks for numbers followed by "টাকা" or "Taka")
-    amount_pattern = r'(\d+)\s*টাকা|Taka|taka'
-    match = re.search(amount_pattern, text)
-    if match:
-        return match.group(1)
-
-    # Try to find any number in the text as fallback
-    number_match = re.search(r'(\d+)', text)
-    if number_match:
-        return number_match.group(1)
-
-    return None
-
-def extract_customer_blocks(input_text):
-    """Split input text into separate customer blocks"""
-    # First, normalize the input by replacing various whitespace patterns
-    normalized_text = re.sub(r'\r\n', '\n', input_text)  # Convert Windows line endings
-    normalized_text = re.sub(r'\r', '\n', normalized_text)  # Convert old Mac line endings
-    normalized_text = re.sub(r'\n\s*\n\s*\n+', '\n\n', normalized_text)  # Reduce multiple blank lines
-    
-    # Split by double newlines (which typically separate customers)
-    blocks = re.split(r'\n\s*\n', normalized_text.strip())
+    # Prefer a number followed by "টাকা" or "Taka", falling back to any number in the text
+    match = _AMOUNT_RE.search(text)
+    return (match.group(1) or match.group(2)) if match else None
+
+def iter_customer_blocks(input_text):
+    """Split input text into separate customer blocks, yielding each block as it is completed"""
+    # Split by blank lines (which typically separate customers); runs of
+    # several blank lines are consumed by a single separator match
+    blocks = _SPLIT_RE.split(input_text.strip())
     
     # Further process blocks to handle cases where customers aren't properly separated
-    customer_blocks = []
+    found_block = False
     current_block = []
     
     for block in blocks:
-        lines = block.split('\n')
-        lines = [line.strip() for line in lines if line.strip()]  # Clean up lines
+        # Clean up lines; splitlines() handles Windows and old Mac line endings
+        lines = [line for line in (raw.strip() for raw in block.splitlines()) if line]
         
         if not lines:
             continue
             
         # Check if this block starts with a customer identifier
-        starts_with_name = any(re.match(r'^(নাম|name|nam|আপনার নাম|আমার নাম|md|Md|MD)', line, re.IGNORECASE) for line in lines[:2])
+        starts_with_name = any(_STARTS_WITH_NAME_RE.match(line) for line in lines[:2])
         
         if starts_with_name and current_block:
-            # If we have a current block and this looks like a new customer, save the current one
-            customer_blocks.append('\n'.join(current_block))
+            # If we have a current block and this looks like a new customer, emit the current one
+            yield '\n'.join(current_block)
+            found_block = True
             current_block = lines
         else:
             # Otherwise, add to current block
@@ -85,17 +84,16 @@ def extract_customer_blocks(input_text):
     
     # Add the last block if it exists
     if current_block:
-        customer_blocks.append('\n'.join(current_block))
+        yield '\n'.join(current_block)
+        found_block = True
     
     # Final validation: if we found no blocks with the above method, treat the whole text as one block
-    if not customer_blocks and input_text.strip():
-        customer_blocks = [input_text.strip()]
-    
-    return customer_blocks
+    if not found_block and input_text.strip():
+        yield input_text.strip()
 
 def process_customer_block(block_text):
     """Process a single customer block and extract data"""
-    lines = block_text.strip().split('\n')
+    lines = [line for line in (raw.strip() for raw in block_text.splitlines()) if line]
 
     # Initialize variables
     name = ""
@@ -103,18 +101,19 @@ def process_customer_block(block_text):
     address_lines = []
     note = ""
     amount = ""
+    expect_note = False  # Set when the previous non-empty line was an order line
 
     # Process each line
     for i, line in enumerate(lines):
-        line = line.strip()
-
-        # Skip empty lines
-        if not line:
-            continue
+        # The first non-empty line after an order line is the order note
+        if expect_note:
+            note = line
+            amount = extract_amount(note)
+            expect_note = False
 
         # Extract name (first non-empty line or line with name)
-        if not name and (i == 0 or any(keyword in line for keyword in ['নাম', 'name',  'nam'])):
-            name = re.sub(r'^(আমার নাম|আপনার নাম|আমার নাম|নাম,|নামঃ|নাম|name|nam)\s*[:：]?\s*', '', line, flags=re.IGNORECASE).strip()
+        if not name and (i == 0 or _NAME_KW_RE.search(line)):
+            name = _NAME_PREFIX_RE.sub('', line, count=1).strip()
 
         # Extract phone (look for 11 digits in any format)
         if not phone:
@@ -122,19 +121,15 @@ def process_customer_block(block_text):
             if extracted_phone:
                 phone = extracted_phone
 
+        is_order_line = _ORDER_RE.search(line)
+
         # Extract address (lines with address keywords)
-        address_keywords = ['jela','Jela', 'জেলা', 'থানা', 'এলাকা', 'ঠিকানা', 'এলাকার নাম', 'address','Address','ADDRESS', 'area']
-        if any(keyword in line for keyword in address_keywords) and not any(order_keyword in line for order_keyword in ['অর্ডার', 'অডার', 'order', 'Order']):
+        if _ADDR_RE.search(line) and not is_order_line:
             address_lines.append(line)
 
-        # Extract order note
-        if 'অর্ডার' in line or 'order' in line or 'অডার' in line or 'Order' in line:
-            # The next non-empty line is the order note
-            for j in range(i+1, len(lines)):
-                if lines[j].strip():
-                    note = lines[j].strip()
-                    amount = extract_amount(note)
-                    break
+        # Extract order note from the next non-empty line
+        if is_order_line:
+            expect_note = True
 
     # Combine address lines
     address = '\n'.join(address_lines)
@@ -148,20 +143,14 @@ def process_customer_block(block_text):
         'Delivery Type': 'Home'
     }
 
-def validate_data(data):
-    """Validate extracted data"""
-    missing_fields = []
-
-    if not data['Name']:
-        missing_fields.append('Name')
-    if not data['Phone'] or len(data['Phone']) != 11:
-        missing_fields.append('Phone')
-    if not data['Address']:
-        missing_fields.append('Address')
-    if not data['Amount']:
-        missing_fields.append('Amount')
-
-    return missing_fields
+def find_missing_fields(df):
+    """Flag missing or invalid fields for every extracted entry"""
+    return pd.DataFrame({
+        'Name': df['Name'].eq(''),
+        'Phone': df['Phone'].str.len().ne(11),
+        'Address': df['Address'].eq(''),
+        'Amount': df['Amount'].fillna('').eq('')
+    })
 
 def main():
     st.title("Bengali Data Extraction to Excel - Multiple Entries")
@@ -175,40 +164,35 @@ def main():
             st.error("No input provided.")
             return
 
-        # Split input into customer blocks
-        customer_blocks = extract_customer_blocks(user_input)
-        st.write(f"Found {len(customer_blocks)} customer entries")
-
-        all_data = []
-        invalid_entries = []
+        # Split input into customer blocks and process each one as it is found
+        extracted = pd.DataFrame.from_records(
+            [process_customer_block(block) for block in iter_customer_blocks(user_input)],
+            columns=['Name', 'Address', 'Phone', 'Amount', 'Note', 'Delivery Type']
+        )
 
-        # Process each customer block
-        for i, block in enumerate(customer_blocks, 1):
-            data = process_customer_block(block)
+        st.write(f"Found {len(extracted)} customer entries")
 
-            # Validate data
-            missing_fields = validate_data(data)
-
-            if missing_fields:
-                invalid_entries.append((i, data, missing_fields))
-            else:
-                all_data.append(data)
+        # Validate data
+        missing = find_missing_fields(extracted)
+        invalid_mask = missing.any(axis=1)
 
         # Handle invalid entries
-        if invalid_entries:
-            st.warning(f"{len(invalid_entries)} entries have missing data and were skipped:")
-            for i, data, missing_fields in invalid_entries:
-                st.write(f"Entry {i}: Missing {', '.join(missing_fields)}")
+        if invalid_mask.any():
+            st.warning(f"{invalid_mask.sum()} entries have missing data and were skipped:")
+            for i, missing_fields in missing[invalid_mask].iterrows():
+                st.write(f"Entry {i + 1}: Missing {', '.join(missing_fields.index[missing_fields])}")
+
+        # Keep only valid entries
+        df = extracted.loc[~invalid_mask].reset_index(drop=True)
 
-        if not all_data:
+        if df.empty:
             st.error("No valid data to process.")
             return
 
-        # Create DataFrame
-        df = pd.DataFrame(all_data)
+        df['Delivery Type'] = df['Delivery Type'].astype('category')
         
         # Add Invoice column at the beginning with sequential numbers
-        df.insert(0, 'Invoice', range(1, len(df) + 1))
+        df.insert(0, 'Invoice', np.arange(1, len(df) + 1, dtype=np.int32))
 
         # Generate filename with current date and time
         now = datetime.now()
@@ -216,35 +200,29 @@ def main():
 
         # Save to Excel
         try:
-            # Create a temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp:
-                df.to_excel(tmp.name, index=False, engine='openpyxl')
-                tmp.flush()
-                
-                # Read the file data for download
-                with open(tmp.name, "rb") as file:
-                    excel_data = file.read()
-                
-                # Clean up
-                os.unlink(tmp.name)
-            
-            st.success(f"Data successfully processed. Total entries: {len(all_data)}")
-            
-            # Display the saved data
-            st.dataframe(df)
-            
-            # Download button
-            st.download_button(
-                label="Download Excel file",
-                data=excel_data,
-                file_name=filename,
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-
+            # Write the workbook to an in-memory buffer for download
+            buffer = io.BytesIO()
+            df.to_excel(buffer, index=False, engine='xlsxwriter')
+            excel_data = buffer.getvalue()
         except ImportError:
-            st.error("The openpyxl package is required to export to Excel. Please add it to your requirements.txt file.")
+            st.error("The xlsxwriter package is required to export to Excel. Please add it to your requirements.txt file.")
+            return
         except Exception as e:
             st.error(f"Error saving to Excel: {str(e)}")
+            return
+
+        st.success(f"Data successfully processed. Total entries: {len(df)}")
+
+        # Display the saved data straight from the DataFrame; the download reuses the buffer bytes
+        st.dataframe(df)
+
+        # Download button
+        st.download_button(
+            label="Download Excel file",
+            data=excel_data,
+            file_name=filename,
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,16 @@
+from app import iter_customer_blocks
+
+
+def test_crlf_line_breaks_do_not_split_blocks():
+    text = "Customer 1\r\nনাম: X\r\n01711111111\r\n\r\nCustomer 2\r\nনাম: Y\r\n01722222222"
+    assert list(iter_customer_blocks(text)) == [
+        "Customer 1\nনাম: X\n01711111111",
+        "Customer 2\nনাম: Y\n01722222222",
+    ]
+
+
+def test_line_ending_styles_split_alike():
+    lines = ["নাম: A", "জেলা: Dhaka", "", "  ", "Customer 2", "name: B", "অর্ডার"]
+    expected = ["নাম: A\nজেলা: Dhaka", "Customer 2\nname: B\nঅর্ডার"]
+    for eol in ("\n", "\r\n", "\r"):
+        assert list(iter_customer_blocks(eol.join(lines))) == expected